@@ -0,0 +1,300 @@
+# 足部人群统计：流式聚合与尺码配货建议
+import json
+from datetime import datetime
+import numpy as np
+from foot_report import ShoeSizeRecommender
+
+
+class StreamingHistogram:
+    """固定分箱直方图：内存有界、可精确合并，并可近似查询分位数"""
+
+    def __init__(self, low, high, bin_width):
+        self.low = low
+        self.high = high
+        self.bin_width = bin_width
+        self.n_bins = int(round((high - low) / bin_width))
+        # 首尾两个额外分箱分别记录下溢和上溢
+        self.counts = np.zeros(self.n_bins + 2, dtype=np.int64)
+        self.total = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, value):
+        """加入单个观测值"""
+        idx = int(np.floor((value - self.low) / self.bin_width)) + 1
+        self.counts[min(max(idx, 0), self.n_bins + 1)] += 1
+        self.total += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other):
+        """合并另一个相同分箱配置的直方图"""
+        if (self.low, self.high, self.bin_width) != (other.low, other.high, other.bin_width):
+            raise ValueError("直方图分箱配置不一致，无法合并")
+        self.counts += other.counts
+        self.total += other.total
+        self.sum += other.sum
+        for attr, pick in (('min', min), ('max', max)):
+            values = [v for v in (getattr(self, attr), getattr(other, attr)) if v is not None]
+            setattr(self, attr, pick(values) if values else None)
+        return self
+
+    def mean(self):
+        return self.sum / self.total if self.total else None
+
+    def quantile(self, q):
+        """按分箱内线性插值估计分位数，误差不超过一个分箱宽度"""
+        if self.total == 0:
+            return None
+        target = q * self.total
+        cumulative = np.cumsum(self.counts)
+        idx = int(np.searchsorted(cumulative, target, side='left'))
+        if idx == 0:
+            return self.min
+        if idx == self.n_bins + 1:
+            return self.max
+        before = cumulative[idx - 1]
+        fraction = (target - before) / self.counts[idx] if self.counts[idx] else 0
+        value = self.low + (idx - 1 + fraction) * self.bin_width
+        return float(min(max(value, self.min), self.max))
+
+    def to_dict(self):
+        return {
+            'low': self.low,
+            'high': self.high,
+            'bin_width': self.bin_width,
+            'counts': self.counts.tolist(),
+            'total': self.total,
+            'sum': self.sum,
+            'min': self.min,
+            'max': self.max
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        hist = cls(data['low'], data['high'], data['bin_width'])
+        hist.counts = np.asarray(data['counts'], dtype=np.int64)
+        hist.total = data['total']
+        hist.sum = data['sum']
+        hist.min = data['min']
+        hist.max = data['max']
+        return hist
+
+
+class PartitionSketch:
+    """
+    单个分区(门店 × 时间段)的统计摘要
+
+    - 脚长直方图 (0.5mm 分箱)
+    - 宽长比直方图 (0.001 分箱)
+    - 尺码行 × 脚宽类型 的列联计数，按男鞋/女鞋/童鞋尺码表分别记录；
+      未指定性别且脚长落在女性/青少年区间(216-260mm)的扫描无法区分男女，
+      单独记在 'women_or_youth:men' 与 'women_or_youth:women' 下（分别按两张尺码表）
+    """
+
+    def __init__(self):
+        self.length_hist = StreamingHistogram(50, 350, 0.5)
+        self.ratio_hist = StreamingHistogram(0.2, 0.6, 0.001)
+        # {gender: {尺码表行号: {脚宽类型: 计数}}}
+        self.size_width_counts = {}
+
+    def add(self, foot_length_mm, ratio, size_entries):
+        """size_entries 为 (计数键, 尺码表行号, 脚宽类型) 列表，同一次扫描可记入多张尺码表"""
+        self.length_hist.add(foot_length_mm)
+        self.ratio_hist.add(ratio)
+        for gender, size_idx, width_type in size_entries:
+            by_size = self.size_width_counts.setdefault(gender, {})
+            by_width = by_size.setdefault(size_idx, {})
+            by_width[width_type] = by_width.get(width_type, 0) + 1
+
+    def merge(self, other):
+        self.length_hist.merge(other.length_hist)
+        self.ratio_hist.merge(other.ratio_hist)
+        for gender, by_size in other.size_width_counts.items():
+            for size_idx, by_width in by_size.items():
+                target = self.size_width_counts.setdefault(gender, {}).setdefault(size_idx, {})
+                for width_type, count in by_width.items():
+                    target[width_type] = target.get(width_type, 0) + count
+        return self
+
+    def to_dict(self):
+        return {
+            'length_hist': self.length_hist.to_dict(),
+            'ratio_hist': self.ratio_hist.to_dict(),
+            # JSON 键只能是字符串
+            'size_width_counts': {
+                gender: {str(size_idx): by_width for size_idx, by_width in by_size.items()}
+                for gender, by_size in self.size_width_counts.items()
+            }
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls()
+        sketch.length_hist = StreamingHistogram.from_dict(data['length_hist'])
+        sketch.ratio_hist = StreamingHistogram.from_dict(data['ratio_hist'])
+        sketch.size_width_counts = {
+            gender: {int(size_idx): dict(by_width) for size_idx, by_width in by_size.items()}
+            for gender, by_size in data['size_width_counts'].items()
+        }
+        return sketch
+
+
+def period_of(timestamp, granularity='month'):
+    """将扫描时间转换为统计周期标签（day / week / month）"""
+    if isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp)
+    if granularity == 'day':
+        return timestamp.strftime('%Y-%m-%d')
+    if granularity == 'week':
+        year, week, _ = timestamp.isocalendar()
+        return f'{year}-W{week:02d}'
+    return timestamp.strftime('%Y-%m')
+
+
+class PopulationAggregator:
+    """
+    按门店和时间段流式聚合扫描结果
+
+    每个分区只保存固定大小的摘要，不保留原始数据；
+    摘要可通过 to_dict / from_dict 在进程或节点之间传递并用 merge 合并
+    """
+
+    def __init__(self, granularity='month'):
+        self.granularity = granularity
+        self.partitions = {}
+        self.recommender = ShoeSizeRecommender()
+
+    def consume(self, measurement_data, store, timestamp, gender='auto'):
+        """消费一次扫描结果（foot_measurements.json 的内容）"""
+        foot_length_mm = measurement_data['foot_length_mm']
+        foot_width_mm = measurement_data['max_width_mm']
+
+        if gender == 'auto':
+            gender = self.recommender.determine_age_group(foot_length_mm)
+
+        if gender == 'women_or_youth':
+            # 无法区分男女，按男鞋和女鞋尺码表各记一份，配货时再决定如何计入
+            charts = [('women_or_youth:men', 'men'), ('women_or_youth:women', 'women')]
+        else:
+            charts = [(gender, gender)]
+
+        size_entries = []
+        for count_key, chart in charts:
+            if chart == 'kids':
+                # 童鞋不分宽窄
+                width_type = 'M'
+            else:
+                width_type = self.recommender.analyze_foot_width(foot_length_mm, foot_width_mm, chart)['type']
+            size_entries.append((count_key, self.recommender.find_size_index(foot_length_mm, chart), width_type))
+
+        key = (store, period_of(timestamp, self.granularity))
+        sketch = self.partitions.setdefault(key, PartitionSketch())
+        sketch.add(foot_length_mm, foot_width_mm / foot_length_mm, size_entries)
+
+    def merge(self, other):
+        """合并另一个聚合器（如其他进程或节点的结果）"""
+        if self.granularity != other.granularity:
+            raise ValueError("统计周期粒度不一致，无法合并")
+        for key, sketch in other.partitions.items():
+            if key in self.partitions:
+                self.partitions[key].merge(sketch)
+            else:
+                self.partitions[key] = PartitionSketch.from_dict(sketch.to_dict())
+        return self
+
+    def combined(self, stores=None, periods=None):
+        """合并指定门店/时间段的分区，None 表示全部"""
+        result = PartitionSketch()
+        for (store, period), sketch in self.partitions.items():
+            if stores is not None and store not in stores:
+                continue
+            if periods is not None and period not in periods:
+                continue
+            result.merge(sketch)
+        return result
+
+    def summary(self, stores=None, periods=None):
+        """脚长与宽长比的分布概要"""
+        sketch = self.combined(stores, periods)
+        quantiles = (0.05, 0.25, 0.5, 0.75, 0.95)
+        return {
+            'count': sketch.length_hist.total,
+            'foot_length_mm': {
+                'mean': sketch.length_hist.mean(),
+                'quantiles': {q: sketch.length_hist.quantile(q) for q in quantiles}
+            },
+            'width_ratio': {
+                'mean': sketch.ratio_hist.mean(),
+                'quantiles': {q: sketch.ratio_hist.quantile(q) for q in quantiles}
+            }
+        }
+
+    def size_run(self, total_pairs, gender='men', system='CN', stores=None, periods=None, ambiguous_weight=0.5):
+        """
+        按 men_size_chart / women_size_chart 的尺码行生成配货建议
+
+        按各尺码的人数占比分配 total_pairs 双，采用最大余数法保证总数不变。
+        未指定性别、脚长在 216-260mm 的扫描无法区分男女，男鞋和女鞋配货都会
+        按 ambiguous_weight 计入这部分人数：默认 0.5 即男女各算半个，
+        0 表示不计入，1 表示在两边都按完整人数计入
+        """
+        sketch = self.combined(stores, periods)
+        size_chart = self.recommender.get_size_chart(gender)
+        n_sizes = len(size_chart['foot_length'])
+
+        by_size = [dict(sketch.size_width_counts.get(gender, {}).get(i, {})) for i in range(n_sizes)]
+        if gender in ('men', 'women') and ambiguous_weight:
+            ambiguous = sketch.size_width_counts.get(f'women_or_youth:{gender}', {})
+            for i, by_width in ambiguous.items():
+                for width_type, count in by_width.items():
+                    by_size[i][width_type] = by_size[i].get(width_type, 0) + ambiguous_weight * count
+
+        counts = np.array([sum(by_width.values()) for by_width in by_size], dtype=np.float64)
+        if counts.sum() == 0:
+            return []
+
+        exact = counts / counts.sum() * total_pairs
+        pairs = np.floor(exact).astype(int)
+        remainder_order = np.argsort(-(exact - pairs), kind='stable')
+        pairs[remainder_order[:total_pairs - pairs.sum()]] += 1
+
+        run = []
+        for i, count in enumerate(counts):
+            if count == 0 and pairs[i] == 0:
+                continue
+            run.append({
+                'size': size_chart[system][i],
+                'foot_length': size_chart['foot_length'][i],
+                'share': float(count / counts.sum()),
+                'pairs': int(pairs[i]),
+                'width_types': by_size[i]
+            })
+        return run
+
+    def to_dict(self):
+        return {
+            'granularity': self.granularity,
+            'partitions': [
+                {'store': store, 'period': period, 'sketch': sketch.to_dict()}
+                for (store, period), sketch in self.partitions.items()
+            ]
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        aggregator = cls(data['granularity'])
+        for item in data['partitions']:
+            aggregator.partitions[(item['store'], item['period'])] = PartitionSketch.from_dict(item['sketch'])
+        return aggregator
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r') as f:
+            return cls.from_dict(json.load(f))
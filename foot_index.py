@@ -0,0 +1,273 @@
+# 足部宽度曲线相似检索
+import os
+import json
+import shutil
+from contextlib import contextmanager
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows 没有 fcntl 模块，此时不做跨进程加锁
+    fcntl = None
+
+
+# 按足长归一化后的重采样点数（0=脚尖, 1=脚跟）
+DEFAULT_GRID_POINTS = 64
+
+
+def resample_width_profile(measurement_data, grid_points=DEFAULT_GRID_POINTS):
+    """
+    将每5mm采样的宽度曲线重采样到固定的足长归一化网格，
+    末尾追加足长(mm)以保留绝对尺寸信息
+    """
+    positions = np.asarray(measurement_data['positions_mm'], dtype=np.float64)
+    widths = np.asarray(measurement_data['widths_mm'], dtype=np.float64)
+    foot_length_mm = float(measurement_data['foot_length_mm'])
+    if len(positions) == 0 or len(positions) != len(widths) or foot_length_mm <= 0:
+        raise ValueError("测量数据中没有有效的宽度采样点，无法生成宽度曲线")
+
+    grid = np.linspace(0, 1, grid_points)
+    profile = np.interp(grid, positions / foot_length_mm, widths)
+    return np.append(profile, foot_length_mm).astype(np.float32)
+
+
+def load_measurement(json_path):
+    """读取 process_foot_measurement 保存的 foot_measurements.json"""
+    with open(json_path, 'r') as f:
+        return json.load(f)
+
+
+def _squared_distances(data, centers):
+    """计算每个样本到各中心的欧氏距离平方"""
+    return (np.sum(data ** 2, axis=1)[:, None]
+            - 2 * data @ centers.T
+            + np.sum(centers ** 2, axis=1)[None, :])
+
+
+def _nearest_center(data, centers, chunk_size=65536):
+    """分块计算最近中心，避免一次性生成过大的距离矩阵"""
+    labels = np.empty(len(data), dtype=np.int32)
+    for start in range(0, len(data), chunk_size):
+        chunk = data[start:start + chunk_size]
+        labels[start:start + chunk_size] = np.argmin(_squared_distances(chunk, centers), axis=1)
+    return labels
+
+
+def _kmeans(data, n_clusters, n_iter=20, seed=0):
+    """简单的 k-means，用于训练倒排列表的粗聚类中心"""
+    rng = np.random.default_rng(seed)
+    centers = data[rng.choice(len(data), n_clusters, replace=False)].copy()
+    for _ in range(n_iter):
+        labels = _nearest_center(data, centers)
+        sums = np.zeros_like(centers)
+        np.add.at(sums, labels, data)
+        counts = np.bincount(labels, minlength=n_clusters)
+        # 空簇保留原中心
+        filled = counts > 0
+        centers[filled] = sums[filled] / counts[filled, None]
+    return centers
+
+
+class FootProfileIndex:
+    """
+    足部宽度曲线相似检索索引
+
+    曲线先经 PCA 压缩，再以倒排列表(IVF)组织在磁盘上：
+    - vectors.f32: 压缩后的向量，按插入顺序追加
+    - lists/<c>.i32: 每个粗聚类中心下的行号，支持增量插入
+    - ids.jsonl: 行号对应的扫描编号
+
+    meta.json 最后写入，其中的 count 是唯一可信的已提交行数。
+    读取时忽略超出 count 的数据（可能是其他进程正在写入的部分）；
+    只有持有写锁的 add_batch 才会截断上次中断留下的多余数据
+    """
+
+    def __init__(self, index_dir):
+        self.index_dir = index_dir
+        model = np.load(os.path.join(index_dir, 'model.npz'))
+        self.mean = model['mean']
+        self.components = model['components']
+        self.centroids = model['centroids']
+        self._load_meta()
+
+    def _load_meta(self):
+        """读取已提交的 meta.json 与对应的扫描编号"""
+        with open(os.path.join(self.index_dir, 'meta.json'), 'r') as f:
+            self.meta = json.load(f)
+        count = self.meta['count']
+        with open(os.path.join(self.index_dir, 'ids.jsonl'), 'r') as f:
+            self.scan_ids = [json.loads(line) for _, line in zip(range(count), f)]
+
+    @contextmanager
+    def _write_lock(self):
+        """跨进程的排他写锁，保证同一时刻只有一个 add_batch 在写"""
+        with open(os.path.join(self.index_dir, 'write.lock'), 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _recover(self):
+        """截断上次写入中断留下的、超出 count 的数据（须持有写锁）"""
+        count = self.meta['count']
+        vector_path = os.path.join(self.index_dir, 'vectors.f32')
+        committed_bytes = count * self.meta['n_components'] * np.dtype(np.float32).itemsize
+        if os.path.getsize(vector_path) <= committed_bytes:
+            return
+
+        print(f"⚠️ 检测到未完成的写入，索引回滚到 {count} 条记录")
+        with open(vector_path, 'r+b') as f:
+            f.truncate(committed_bytes)
+
+        ids_path = os.path.join(self.index_dir, 'ids.jsonl')
+        with open(ids_path, 'r') as f:
+            lines = f.readlines()[:count]
+        with open(ids_path, 'w') as f:
+            f.writelines(lines)
+
+        for list_id in range(self.meta['n_lists']):
+            path = self._list_path(list_id)
+            if not os.path.exists(path):
+                continue
+            rows = np.fromfile(path, dtype=np.int32)
+            if np.any(rows >= count):
+                rows[rows < count].tofile(path)
+
+    @classmethod
+    def create(cls, index_dir, training_measurements, n_components=32, n_lists=256,
+               grid_points=DEFAULT_GRID_POINTS):
+        """
+        用一批历史测量数据训练 PCA 与粗聚类中心，创建空索引
+
+        训练样本只用于建模，需要检索的足部请再通过 add / add_batch 写入；
+        index_dir 中已有的索引会被整体覆盖
+        """
+        raw = np.stack([resample_width_profile(m, grid_points) for m in training_measurements])
+        n_components = min(n_components, raw.shape[0], raw.shape[1])
+        n_lists = min(n_lists, raw.shape[0])
+
+        # PCA 降维
+        mean = raw.mean(axis=0)
+        _, _, vt = np.linalg.svd(raw - mean, full_matrices=False)
+        components = vt[:n_components].astype(np.float32)
+        projected = ((raw - mean) @ components.T).astype(np.float32)
+
+        centroids = _kmeans(projected, n_lists)
+
+        # 重建时清空旧的倒排列表，否则其中的行号会指向已不存在的向量
+        shutil.rmtree(os.path.join(index_dir, 'lists'), ignore_errors=True)
+        os.makedirs(os.path.join(index_dir, 'lists'))
+        np.savez(os.path.join(index_dir, 'model.npz'),
+                 mean=mean.astype(np.float32), components=components, centroids=centroids)
+        meta = {
+            'grid_points': grid_points,
+            'n_components': int(n_components),
+            'n_lists': int(n_lists),
+            'count': 0
+        }
+        with open(os.path.join(index_dir, 'meta.json'), 'w') as f:
+            json.dump(meta, f, indent=2)
+        open(os.path.join(index_dir, 'vectors.f32'), 'wb').close()
+        open(os.path.join(index_dir, 'ids.jsonl'), 'w').close()
+
+        print(f"✅ 索引已创建: {index_dir} (维度 {n_components}, 倒排列表 {n_lists})")
+        return cls(index_dir)
+
+    def __len__(self):
+        return self.meta['count']
+
+    def project(self, measurement_data):
+        """将单次测量数据转换为压缩后的检索向量"""
+        raw = resample_width_profile(measurement_data, self.meta['grid_points'])
+        return ((raw - self.mean) @ self.components.T).astype(np.float32)
+
+    def add(self, scan_id, measurement_data):
+        """增量插入一次新扫描"""
+        self.add_batch([(scan_id, measurement_data)])
+
+    def add_batch(self, items):
+        """批量增量插入，items 为 (scan_id, measurement_data) 序列"""
+        if not items:
+            return
+        vectors = np.stack([self.project(m) for _, m in items])
+        labels = _nearest_center(vectors, self.centroids)
+        with self._write_lock():
+            # 其他进程可能已提交了新的数据，先重新读取再回滚中断的写入
+            self._load_meta()
+            self._recover()
+            self._append(items, vectors, labels)
+
+    def _append(self, items, vectors, labels):
+        start_row = self.meta['count']
+        rows = np.arange(start_row, start_row + len(items), dtype=np.int32)
+
+        with open(os.path.join(self.index_dir, 'vectors.f32'), 'ab') as f:
+            f.write(vectors.tobytes())
+        for list_id in np.unique(labels):
+            with open(self._list_path(list_id), 'ab') as f:
+                f.write(rows[labels == list_id].tobytes())
+        with open(os.path.join(self.index_dir, 'ids.jsonl'), 'a') as f:
+            for scan_id, _ in items:
+                f.write(json.dumps(scan_id) + '\n')
+
+        self.scan_ids.extend(scan_id for scan_id, _ in items)
+        self.meta['count'] = start_row + len(items)
+        # 最后原子地更新 meta.json，作为本次插入的提交点
+        meta_path = os.path.join(self.index_dir, 'meta.json')
+        with open(meta_path + '.tmp', 'w') as f:
+            json.dump(self.meta, f, indent=2)
+        os.replace(meta_path + '.tmp', meta_path)
+
+    def search(self, measurement_data, k=10, exact=False, nprobe=8, chunk_size=1 << 20):
+        """
+        查找与给定足部最相似的 k 个历史扫描
+
+        exact=True 时分块遍历全部向量；否则只扫描最近的 nprobe 个倒排列表
+        """
+        if len(self) == 0:
+            return []
+        query = self.project(measurement_data)
+        vectors = self._vectors()
+
+        if exact:
+            best_rows = np.empty(0, dtype=np.int64)
+            best_dist = np.empty(0, dtype=np.float32)
+            for start in range(0, len(vectors), chunk_size):
+                chunk = np.asarray(vectors[start:start + chunk_size])
+                dist = np.sum((chunk - query) ** 2, axis=1)
+                best_rows = np.concatenate([best_rows, np.arange(start, start + len(chunk))])
+                best_dist = np.concatenate([best_dist, dist])
+                best_rows, best_dist = self._top_k(best_rows, best_dist, k)
+        else:
+            center_dist = np.sum((self.centroids - query) ** 2, axis=1)
+            probe = np.argsort(center_dist)[:nprobe]
+            rows = [np.fromfile(self._list_path(c), dtype=np.int32)
+                    for c in probe if os.path.exists(self._list_path(c))]
+            best_rows = np.sort(np.concatenate(rows)) if rows else np.empty(0, dtype=np.int32)
+            # 忽略尚未提交的行
+            best_rows = best_rows[best_rows < len(self)]
+            best_dist = np.sum((vectors[best_rows] - query) ** 2, axis=1)
+            best_rows, best_dist = self._top_k(best_rows, best_dist, k)
+
+        return [{'scan_id': self.scan_ids[row], 'distance': float(np.sqrt(max(dist, 0)))}
+                for row, dist in zip(best_rows, best_dist)]
+
+    def _vectors(self):
+        """以内存映射方式打开向量文件"""
+        return np.memmap(os.path.join(self.index_dir, 'vectors.f32'), dtype=np.float32, mode='r',
+                         shape=(len(self), self.meta['n_components']))
+
+    def _list_path(self, list_id):
+        return os.path.join(self.index_dir, 'lists', f'{int(list_id)}.i32')
+
+    @staticmethod
+    def _top_k(rows, dist, k):
+        """保留距离最小的 k 个结果，按距离升序排列"""
+        if len(dist) > k:
+            keep = np.argpartition(dist, k)[:k]
+            rows, dist = rows[keep], dist[keep]
+        order = np.argsort(dist)
+        return rows[order], dist[order]
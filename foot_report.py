@@ -139,19 +139,31 @@ class ShoeSizeRecommender:
         else:
             return self._get_adult_recommendation(foot_length_mm, foot_width_mm, gender)
     
-    def _get_adult_recommendation(self, foot_length_mm, foot_width_mm, gender):
-        """获取成人尺码推荐"""
-        size_chart = self.men_size_chart if gender == 'men' else self.women_size_chart
-        df = pd.DataFrame(size_chart)
+    def get_size_chart(self, gender):
+        """获取对应类别的尺码表"""
+        if gender == 'kids':
+            return self.kids_size_chart
+        return self.men_size_chart if gender == 'men' else self.women_size_chart
+    
+    def find_size_index(self, foot_length_mm, gender):
+        """在尺码表中查找推荐尺码所在行"""
+        foot_lengths = np.asarray(self.get_size_chart(gender)['foot_length'])
         
         # 找到最接近的脚长
-        foot_lengths = df['foot_length'].values
-        closest_idx = np.argmin(np.abs(foot_lengths - foot_length_mm))
+        closest_idx = int(np.argmin(np.abs(foot_lengths - foot_length_mm)))
         
         # 如果脚长在两个尺码之间，建议选择较大的
-        if foot_length_mm > foot_lengths[closest_idx] and closest_idx < len(df) - 1:
+        if foot_length_mm > foot_lengths[closest_idx] and closest_idx < len(foot_lengths) - 1:
             closest_idx += 1
         
+        return closest_idx
+    
+    def _get_adult_recommendation(self, foot_length_mm, foot_width_mm, gender):
+        """获取成人尺码推荐"""
+        size_chart = self.men_size_chart if gender == 'men' else self.women_size_chart
+        df = pd.DataFrame(size_chart)
+        closest_idx = self.find_size_index(foot_length_mm, gender)
+        
         # 获取推荐尺码
         recommendations = {}
         for country in ['CN', 'EU', 'US', 'UK', 'JP']:
@@ -181,14 +193,7 @@ class ShoeSizeRecommender:
     def _get_kids_recommendation(self, foot_length_mm, foot_width_mm):
         """获取童鞋尺码推荐"""
         df = pd.DataFrame(self.kids_size_chart)
-        
-        # 找到最接近的脚长
-        foot_lengths = df['foot_length'].values
-        closest_idx = np.argmin(np.abs(foot_lengths - foot_length_mm))
-        
-        # 如果脚长在两个尺码之间，建议选择较大的
-        if foot_length_mm > foot_lengths[closest_idx] and closest_idx < len(df) - 1:
-            closest_idx += 1
+        closest_idx = self.find_size_index(foot_length_mm, 'kids')
         
         # 获取推荐尺码
         recommendations = {}
@@ -0,0 +1,488 @@
+# 3D打印鞋垫导出：足部轮廓 + 宽度曲线 + 对齐压力图 -> 晶格密度场 -> 分片流式网格
+import os
+import json
+import time
+import struct
+import zipfile
+import tempfile
+import tracemalloc
+import cv2
+import numpy as np
+from process_foot import FootMaskState
+
+
+# README 3D打印鞋设计中的密度分区（按 245mm 足长给出，实际按足长等比缩放）
+REFERENCE_FOOT_LENGTH_MM = 245
+HEEL_ZONE_MM = 60     # 后跟区域：距足跟 0-60mm，填充率 75-85%
+ARCH_ZONE_MM = 150    # 足弓区域：距足跟 60-150mm，填充率 50-70%
+ZONE_DENSITY = {
+    'toe': (0.40, 0.50),
+    'forefoot': (0.60, 0.70),
+    'arch': (0.50, 0.70),
+    'heel': (0.75, 0.85)
+}
+
+
+def load_pressure_map(csv_path='MUN104L_cleaned.csv'):
+    """读取 MUN104 平均足底压力矩阵（脚尖在上，足跟在下）"""
+    return np.loadtxt(csv_path, delimiter=',')
+
+
+def align_pressure_to_mask(pressure, foot_mask, mirror=False):
+    """
+    水平扫描线对齐：将压力图逐行拉伸到足部掩膜上
+
+    掩膜第 y 行按其在足长中的相对位置对应压力图的某一行，
+    再把该行压力的左右范围线性映射到掩膜该行的左右边界
+    """
+    if mirror:
+        pressure = pressure[:, ::-1]
+    pressure = np.ascontiguousarray(pressure, dtype=np.float32)
+
+    mask_state = FootMaskState(foot_mask)
+    pressure_state = FootMaskState((pressure > 0).astype(np.uint8))
+
+    # 压力图中没有数据的行，用相邻行的左右范围插值
+    rows = np.arange(pressure.shape[0])
+    valid = pressure_state.row_left >= 0
+    pressure_left = np.interp(rows, rows[valid], pressure_state.row_left[valid])
+    pressure_right = np.interp(rows, rows[valid], pressure_state.row_right[valid])
+
+    height, width = foot_mask.shape[:2]
+    y = np.arange(height)
+    t = (y - mask_state.top_y) / max(mask_state.bottom_y - mask_state.top_y, 1)
+    map_y = pressure_state.top_y + t * (pressure_state.bottom_y - pressure_state.top_y)
+    nearest_row = np.clip(np.round(map_y).astype(int), 0, pressure.shape[0] - 1)
+
+    left = mask_state.row_left.astype(np.float64)
+    right = mask_state.row_right.astype(np.float64)
+    x = np.arange(width)
+    s = (x[None, :] - left[:, None]) / np.maximum(right - left, 1)[:, None]
+    map_x = pressure_left[nearest_row][:, None] + s * (pressure_right - pressure_left)[nearest_row][:, None]
+
+    aligned = cv2.remap(pressure, map_x.astype(np.float32),
+                        np.repeat(map_y[:, None], width, axis=1).astype(np.float32),
+                        cv2.INTER_LINEAR, borderMode=cv2.BORDER_CONSTANT, borderValue=0)
+    aligned[foot_mask == 0] = 0
+    return aligned
+
+
+def build_density_field(foot_mask, measurement_data, aligned_pressure, cell_mm=(3.0, 6.0),
+                        forefoot_anisotropy=1.5, edge_boost=0.08, edge_band_mm=4.0):
+    """
+    在掩膜分辨率上计算晶格参数场
+
+    - density: 填充率，按后跟/足弓/前掌/脚趾分区，分区内随压力升高
+    - cell: 六边形晶格单元间距(mm)，高压区域单元更小
+    - anisotropy: 纵向拉伸系数，前掌区域各向异性以便前后弯曲
+    """
+    state = FootMaskState(foot_mask)
+    inside = foot_mask > 0
+    pixel_to_mm = min(state.pixel_to_mm_x, state.pixel_to_mm_y)
+
+    # 每行距脚尖的距离(mm)
+    distance_mm = (np.arange(state.height) - state.top_y) * state.pixel_to_mm_y
+    foot_length_mm = measurement_data['foot_length_mm']
+    scale = foot_length_mm / REFERENCE_FOOT_LENGTH_MM
+    heel_start = foot_length_mm - HEEL_ZONE_MM * scale
+    arch_start = foot_length_mm - ARCH_ZONE_MM * scale
+    blend = 5.0
+
+    # 由宽度曲线确定脚趾区与前掌最宽处
+    widths = np.asarray(measurement_data['widths_mm'])
+    positions = np.asarray(measurement_data['positions_mm'])
+    toe_end = positions[np.argmax(widths >= 0.85 * widths.max())]
+    ball = measurement_data['max_width_position_mm']
+
+    breakpoints = np.maximum.accumulate([0, toe_end, ball, arch_start - blend, arch_start + blend,
+                                         heel_start - blend, heel_start + blend, foot_length_mm])
+    zones = ['toe', 'toe', 'forefoot', 'forefoot', 'arch', 'arch', 'heel', 'heel']
+    row_lo = np.interp(distance_mm, breakpoints, [ZONE_DENSITY[z][0] for z in zones])
+    row_hi = np.interp(distance_mm, breakpoints, [ZONE_DENSITY[z][1] for z in zones])
+    row_anisotropy = np.interp(distance_mm, [arch_start - blend, arch_start + blend],
+                               [forefoot_anisotropy, 1.0])
+
+    # 压力归一化到 [0, 1]
+    foot_pressure = aligned_pressure[inside]
+    reference = np.percentile(foot_pressure, 95) if foot_pressure.size and foot_pressure.max() > 0 else 1.0
+    pressure = np.clip(aligned_pressure / reference, 0, 1)
+
+    density = row_lo[:, None] + (row_hi - row_lo)[:, None] * pressure
+
+    # 边缘增加密度以提供侧向支撑，但不超过所在分区的填充率上限
+    edge_distance_mm = cv2.distanceTransform(inside.astype(np.uint8), cv2.DIST_L2, 5) * pixel_to_mm
+    density += edge_boost * np.clip(1 - edge_distance_mm / edge_band_mm, 0, 1)
+    density = np.minimum(density, row_hi[:, None])
+
+    cell = cell_mm[1] - (cell_mm[1] - cell_mm[0]) * pressure
+
+    # 平滑参数场，避免晶格在分区边界处断裂
+    sigma = 3.0 / pixel_to_mm
+    density = cv2.GaussianBlur(density.astype(np.float32), (0, 0), sigma)
+    density = np.clip(density, 0, row_hi[:, None])
+    cell = cv2.GaussianBlur(cell.astype(np.float32), (0, 0), sigma * 2)
+
+    return {
+        'density': density.astype(np.float32),
+        'cell': cell.astype(np.float32),
+        'anisotropy': np.repeat(row_anisotropy[:, None], state.width, axis=1).astype(np.float32),
+        'inside': inside.astype(np.uint8),
+        'pixel_to_mm_x': state.pixel_to_mm_x,
+        'pixel_to_mm_y': state.pixel_to_mm_y,
+        'bbox_px': (int(state.row_left[state.row_left >= 0].min()), state.top_y,
+                    int(state.row_right.max()), state.bottom_y)
+    }
+
+
+def _hex_solid(u, v, density):
+    """
+    六边形蜂窝壁判定，u/v 为以单元间距为单位的坐标
+
+    到单元边界的归一化距离小于 1 - sqrt(1 - density) 时为实体，
+    此时实体面积占比恰好等于 density
+    """
+    sqrt3_2 = np.sqrt(3) / 2
+    f2 = v / sqrt3_2
+    f1 = u - 0.5 * f2
+    b1 = np.floor(f1)
+    b2 = np.floor(f2)
+
+    # 最近的晶格中心必为所在菱形的四个顶点之一
+    best = None
+    for o1, o2 in ((0, 0), (1, 0), (0, 1), (1, 1)):
+        cx = (b1 + o1) + 0.5 * (b2 + o2)
+        cy = (b2 + o2) * sqrt3_2
+        dx = u - cx
+        dy = v - cy
+        dist = dx * dx + dy * dy
+        if best is None:
+            best, best_dx, best_dy = dist, dx, dy
+        else:
+            closer = dist < best
+            best = np.where(closer, dist, best)
+            best_dx = np.where(closer, dx, best_dx)
+            best_dy = np.where(closer, dy, best_dy)
+
+    hex_norm = np.maximum.reduce([np.abs(best_dx),
+                                  np.abs(0.5 * best_dx + sqrt3_2 * best_dy),
+                                  np.abs(-0.5 * best_dx + sqrt3_2 * best_dy)])
+    edge_distance = 1 - hex_norm / 0.5
+    return edge_distance < 1 - np.sqrt(1 - density)
+
+
+def _close_diagonal_contacts(mask, prev_row):
+    """
+    逐行消除二维掩膜中只以对角相接的实体（非流形边）
+
+    若上一行某格为实体、本行该格为空，而本行相邻格为实体且其上方为空，
+    则补上本行该格。补上的格上方必为实体，不会产生新的对角接触，
+    因此按行顺序处理一遍即可
+    """
+    mask = mask.copy()
+    for j in range(len(mask)):
+        above = prev_row if j == 0 else mask[j - 1]
+        row = mask[j]
+        diagonal = row & ~above
+        neighbour = np.zeros_like(row)
+        neighbour[1:] |= diagonal[:-1]
+        neighbour[:-1] |= diagonal[1:]
+        row |= above & neighbour
+    return mask
+
+
+# 每个轴的两个切向轴，满足 u × v = 法向
+_FACE_TANGENTS = {0: (1, 2), 1: (2, 0), 2: (0, 1)}
+
+
+def _faces_to_triangles(corner, axis, sign):
+    """将体素面（index 坐标下的起始角点）转换为两组三角形及法向"""
+    u_axis, v_axis = _FACE_TANGENTS[axis]
+    u = np.zeros(3)
+    v = np.zeros(3)
+    u[u_axis] = 1
+    v[v_axis] = 1
+    quad = np.stack([corner, corner + u, corner + u + v, corner + v], axis=1)
+    # 法向为负时反转绕序
+    quad[sign < 0] = quad[sign < 0][:, ::-1]
+    triangles = np.concatenate([quad[:, [0, 1, 2]], quad[:, [0, 2, 3]]])
+    normals = np.zeros((len(triangles), 3))
+    normals[:, axis] = np.concatenate([sign, sign])
+    return triangles, normals
+
+
+def _slab_triangles(occupancy, prev_row, j0, is_last):
+    """提取一个 y 方向分片中所有实体/空气交界面的三角形"""
+    triangles = []
+    normals = []
+
+    # x / z 方向的面完全落在分片内
+    for axis in (1, 2):
+        pad = [(0, 0)] * 3
+        pad[axis] = (1, 1)
+        diff = np.diff(np.pad(occupancy, pad).astype(np.int8), axis=axis)
+        a, b, c = np.nonzero(diff)
+        sign = -diff[a, b, c].astype(np.float64)
+        # occupancy 的轴顺序为 (y, x, z)，转换为 (x, y, z)
+        corner = np.stack([b, a + j0, c], axis=1).astype(np.float64)
+        tri, nrm = _faces_to_triangles(corner, 0 if axis == 1 else 2, sign)
+        triangles.append(tri)
+        normals.append(nrm)
+
+    # y 方向需要上一分片的最后一行；最后一个分片还要封闭末端
+    stacked = np.concatenate([prev_row[None], occupancy])
+    if is_last:
+        stacked = np.concatenate([stacked, np.zeros_like(prev_row)[None]])
+    diff = np.diff(stacked.astype(np.int8), axis=0)
+    a, b, c = np.nonzero(diff)
+    sign = -diff[a, b, c].astype(np.float64)
+    corner = np.stack([b, a + j0, c], axis=1).astype(np.float64)
+    tri, nrm = _faces_to_triangles(corner, 1, sign)
+    triangles.append(tri)
+    normals.append(nrm)
+
+    return np.concatenate(triangles), np.concatenate(normals)
+
+
+class StlWriter:
+    """二进制 STL 流式写入，三角形数量在关闭时回填"""
+
+    record = np.dtype([('normal', '<f4', (3,)), ('vertices', '<f4', (3, 3)), ('attr', '<u2')])
+
+    def __init__(self, path):
+        self.file = open(path, 'wb')
+        self.file.write(b'FootScan insole lattice'.ljust(80, b' '))
+        self.file.write(struct.pack('<I', 0))
+        self.count = 0
+
+    def write(self, triangles, normals):
+        records = np.zeros(len(triangles), dtype=self.record)
+        records['normal'] = normals
+        records['vertices'] = triangles
+        records.tofile(self.file)
+        self.count += len(triangles)
+
+    def close(self):
+        self.file.seek(80)
+        self.file.write(struct.pack('<I', self.count))
+        self.file.close()
+
+
+def _format_rows(values, fragments, decimals=0, chunk_rows=1 << 16):
+    """
+    将整数矩阵按模板批量格式化为 ASCII 字节串，避免逐个数字创建 Python 对象
+
+    values 为 (n, m) 整数，decimals > 0 时视为放大 10**decimals 倍的定点数；
+    fragments 为 m + 1 个字节串，依次夹在各列数字前后。按 chunk_rows 分块以限制临时内存
+    """
+    values = np.asarray(values, dtype=np.int64)
+    n, m = values.shape
+    if n > chunk_rows:
+        return b''.join(_format_rows(values[start:start + chunk_rows], fragments, decimals, chunk_rows)
+                        for start in range(0, n, chunk_rows))
+    magnitude = np.abs(values)
+    width = max(len(str(int(magnitude.max()))) if values.size else 1, decimals + 1)
+    digits = np.empty((n, m, width), dtype=np.uint8)
+    for p in range(width):
+        digits[..., p] = (magnitude // 10 ** (width - 1 - p)) % 10 + ord('0')
+    # 去掉前导零，但至少保留个位与小数位
+    n_digits = np.maximum(np.sum(magnitude[..., None] >= 10 ** np.arange(width), axis=-1), decimals + 1)
+    keep_digits = np.arange(width) >= width - n_digits[..., None]
+
+    def constant(text):
+        return np.broadcast_to(np.frombuffer(text, dtype=np.uint8), (n, len(text))), np.ones((n, len(text)), bool)
+
+    blocks = [constant(fragments[0])]
+    split = width - decimals
+    for c in range(m):
+        blocks.append((np.full((n, 1), ord('-'), np.uint8), values[:, c:c + 1] < 0))
+        blocks.append((digits[:, c, :split], keep_digits[:, c, :split]))
+        if decimals:
+            blocks.append(constant(b'.'))
+            blocks.append((digits[:, c, split:], keep_digits[:, c, split:]))
+        blocks.append(constant(fragments[c + 1]))
+    chars = np.concatenate([block for block, _ in blocks], axis=1)
+    keep = np.concatenate([mask for _, mask in blocks], axis=1)
+    return chars[keep].tobytes()
+
+
+class ThreeMfWriter:
+    """
+    3MF 流式写入：顶点与三角形先分别写入临时文件，关闭时依次拷入压缩包
+
+    每个分片内的顶点去重后写出；相邻分片只共享边界平面上的顶点，
+    因此只需保留上一分片的顶点表即可复用其编号，得到共享索引的封闭网格
+    """
+
+    vertex_fragments = (b'<vertex x="', b'" y="', b'" z="', b'"/>\n')
+    triangle_fragments = (b'<triangle v1="', b'" v2="', b'" v3="', b'"/>\n')
+
+    def __init__(self, path):
+        self.path = path
+        self.vertex_file = tempfile.TemporaryFile('w+b')
+        self.triangle_file = tempfile.TemporaryFile('w+b')
+        self.count = 0
+        self.vertex_count = 0
+        self.prev_keys = np.empty(0, dtype=np.int64)
+        self.prev_ids = np.empty(0, dtype=np.int64)
+
+    def write(self, triangles, normals):
+        # 按输出精度(0.001mm)量化后打包为整数键去重；坐标非负且小于 2097mm，每个占 21 位
+        grid = np.round(triangles.reshape(-1, 3) * 1000).astype(np.int64)
+        keys = (grid[:, 0] << 42) | (grid[:, 1] << 21) | grid[:, 2]
+        unique_keys, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+
+        # 与上一分片的顶点表查重，已出现过的顶点沿用原编号
+        position = np.minimum(np.searchsorted(self.prev_keys, unique_keys), max(len(self.prev_keys) - 1, 0))
+        shared = (self.prev_keys[position] == unique_keys) if len(self.prev_keys) else np.zeros(len(unique_keys), bool)
+        ids = np.empty(len(unique_keys), dtype=np.int64)
+        ids[shared] = self.prev_ids[position[shared]]
+        ids[~shared] = self.vertex_count + np.arange(np.count_nonzero(~shared))
+
+        new_vertices = grid[first[~shared]]
+        self.vertex_file.write(_format_rows(new_vertices, self.vertex_fragments, decimals=3))
+        self.triangle_file.write(_format_rows(ids[inverse.reshape(-1)].reshape(-1, 3), self.triangle_fragments))
+        self.vertex_count += len(new_vertices)
+        self.count += len(triangles)
+        self.prev_keys = unique_keys
+        self.prev_ids = ids
+
+    def close(self):
+        content_types = ('<?xml version="1.0" encoding="UTF-8"?>\n'
+                         '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+                         '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+                         '<Default Extension="model" ContentType="application/vnd.ms-package.3dmanufacturing-3dmodel+xml"/>'
+                         '</Types>')
+        rels = ('<?xml version="1.0" encoding="UTF-8"?>\n'
+                '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                '<Relationship Target="/3D/3dmodel.model" Id="rel0" '
+                'Type="http://schemas.microsoft.com/3dmanufacturing/2013/01/3dmodel"/>'
+                '</Relationships>')
+        with zipfile.ZipFile(self.path, 'w', zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr('[Content_Types].xml', content_types)
+            archive.writestr('_rels/.rels', rels)
+            with archive.open('3D/3dmodel.model', 'w') as model:
+                model.write(b'<?xml version="1.0" encoding="UTF-8"?>\n'
+                            b'<model unit="millimeter" xmlns="http://schemas.microsoft.com/3dmanufacturing/core/2015/02">'
+                            b'<resources><object id="1" type="model"><mesh><vertices>\n')
+                self._copy(self.vertex_file, model)
+                model.write(b'</vertices><triangles>\n')
+                self._copy(self.triangle_file, model)
+                model.write(b'</triangles></mesh></object></resources>'
+                            b'<build><item objectid="1"/></build></model>')
+        self.vertex_file.close()
+        self.triangle_file.close()
+
+    @staticmethod
+    def _copy(source, target, block_size=1 << 20):
+        source.seek(0)
+        for block in iter(lambda: source.read(block_size), b''):
+            target.write(block)
+
+
+def export_insole_lattice(output_path, foot_mask, measurement_data, pressure, voxel_mm=0.5,
+                          thickness_mm=8.0, shell_mm=1.0, slab_rows=64, mirror_pressure=False, **field_options):
+    """
+    生成鞋垫晶格体素并按 y 方向分片流式写出网格（.stl 或 .3mf）
+
+    每个分片只在内存中保存 slab_rows 行体素，0.2mm 分辨率下内存同样有界。
+    返回包含生成耗时与峰值内存的报告。
+    """
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+
+    aligned = align_pressure_to_mask(pressure, foot_mask, mirror=mirror_pressure)
+    field = build_density_field(foot_mask, measurement_data, aligned, **field_options)
+
+    # 体素网格覆盖足部包围盒
+    left_px, top_px, right_px, bottom_px = field['bbox_px']
+    x0 = left_px * field['pixel_to_mm_x']
+    y0 = top_px * field['pixel_to_mm_y']
+    nx = int(np.ceil((right_px + 1 - left_px) * field['pixel_to_mm_x'] / voxel_mm))
+    ny = int(np.ceil((bottom_px + 1 - top_px) * field['pixel_to_mm_y'] / voxel_mm))
+    nz = max(int(round(thickness_mm / voxel_mm)), 1)
+    shell = max(int(round(shell_mm / voxel_mm)), 1)
+    k = np.arange(nz)
+    skin = (k < shell) | (k >= nz - shell)
+
+    writer = ThreeMfWriter(output_path) if output_path.lower().endswith('.3mf') else StlWriter(output_path)
+    x_mm = x0 + (np.arange(nx) + 0.5) * voxel_mm
+    prev_row = np.zeros((nx, nz), dtype=bool)
+    prev_inside = np.zeros(nx, dtype=bool)
+    prev_core = np.zeros(nx, dtype=bool)
+    solid_voxels = 0
+    density_sum = 0.0
+    inside_voxels = 0
+    slabs = 0
+
+    print(f"🧊 体素网格: {nx} × {ny} × {nz} (体素 {voxel_mm}mm)")
+    for j0 in range(0, ny, slab_rows):
+        j1 = min(j0 + slab_rows, ny)
+        y_mm = y0 + (np.arange(j0, j1) + 0.5) * voxel_mm
+
+        # 体素中心对应的掩膜像素坐标
+        map_x = np.broadcast_to(x_mm / field['pixel_to_mm_x'] - 0.5, (j1 - j0, nx)).astype(np.float32)
+        map_y = np.broadcast_to((y_mm / field['pixel_to_mm_y'] - 0.5)[:, None], (j1 - j0, nx)).astype(np.float32)
+        inside = cv2.remap(field['inside'], map_x, map_y, cv2.INTER_NEAREST) > 0
+        density = cv2.remap(field['density'], map_x, map_y, cv2.INTER_LINEAR)
+        cell = cv2.remap(field['cell'], map_x, map_y, cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
+        anisotropy = cv2.remap(field['anisotropy'], map_x, map_y, cv2.INTER_LINEAR,
+                               borderMode=cv2.BORDER_REPLICATE)
+
+        lattice = _hex_solid((x_mm - x0)[None, :] / cell, (y_mm - y0)[:, None] / (cell * anisotropy), density)
+
+        # 上下表皮层为 inside，中间层为 inside & lattice；两者都去掉对角接触后网格才是流形
+        core = _close_diagonal_contacts(inside & lattice, prev_core)
+        inside = _close_diagonal_contacts(inside | core, prev_inside)
+        occupancy = np.where(skin[None, None, :], inside[:, :, None], core[:, :, None])
+
+        triangles, normals = _slab_triangles(occupancy, prev_row, j0, j1 == ny)
+        # index 坐标 -> mm；图像 y 轴向下，翻转为右手坐标系并相应反转绕序
+        triangles *= voxel_mm
+        triangles[..., 1] = ny * voxel_mm - triangles[..., 1]
+        triangles = triangles[:, ::-1]
+        normals[:, 1] *= -1
+        writer.write(triangles, normals)
+
+        prev_row = occupancy[-1]
+        prev_inside = inside[-1]
+        prev_core = core[-1]
+        solid_voxels += int(occupancy.sum())
+        inside_voxels += int(inside.sum())
+        density_sum += float(density[inside].sum())
+        slabs += 1
+
+    writer.close()
+    generation_s = time.perf_counter() - start
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    if started_tracing:
+        tracemalloc.stop()
+
+    report = {
+        'output_path': output_path,
+        'voxel_mm': voxel_mm,
+        'grid': [nx, ny, nz],
+        'slabs': slabs,
+        'solid_voxels': solid_voxels,
+        'triangles': writer.count,
+        'mean_density': density_sum / inside_voxels if inside_voxels else 0.0,
+        'file_bytes': os.path.getsize(output_path),
+        'generation_s': generation_s,
+        'peak_memory_mb': peak_bytes / 1024 ** 2
+    }
+    print(f"✅ 鞋垫网格已保存到 {output_path}: {writer.count} 个三角形, "
+          f"耗时 {generation_s:.1f}s, 峰值内存 {report['peak_memory_mb']:.1f}MB")
+    return report
+
+
+def export_insole_from_results(output_path='result/insole_lattice.stl',
+                               mask_path='result/modified_foot_mask.png',
+                               measurement_path='result/foot_measurements.json',
+                               pressure_csv='MUN104L_cleaned.csv', **options):
+    """使用 process_foot_measurement 的输出文件和 MUN104 压力数据导出鞋垫"""
+    foot_mask = cv2.imread(mask_path, cv2.IMREAD_GRAYSCALE)
+    with open(measurement_path, 'r') as f:
+        measurement_data = json.load(f)
+    return export_insole_lattice(output_path, foot_mask, measurement_data, load_pressure_map(pressure_csv), **options)
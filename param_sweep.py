@@ -0,0 +1,109 @@
+# 测量参数网格搜索：在带标注的扫描集上评估测量误差
+import json
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+import cv2
+import numpy as np
+from process_foot import FootMaskState
+
+
+# 未在网格中给出的参数使用 process_foot_measurement 的默认值
+DEFAULT_MEASURE_PARAMS = {
+    'threshold': [150],
+    'kernel_size': [5],
+    'heel_start_ratio': [0.82],
+    'measurement_interval_mm': [5]
+}
+
+
+def load_scan_set(path):
+    """
+    读取带标注的扫描集（JSON 列表），每项形如：
+    {"image_path": "...", "foot_length_mm": 245.0, "max_width_mm": 96.0}
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _evaluate_scan(scan, grid):
+    """
+    在单个扫描上评估整个参数网格
+
+    同一组 (threshold, kernel_size) 只做一次阈值与形态学处理，
+    其余参数复用缓存的 FootMaskState
+    """
+    image = cv2.imread(scan['image_path'])
+    if image is None:
+        # 图像缺失或无法读取：整个网格都记为失败，不影响其他扫描
+        print(f"❌ 无法读取图像: {scan['image_path']}")
+        return [(params, None, None) for params in itertools.product(
+            grid['threshold'], grid['kernel_size'], grid['heel_start_ratio'], grid['measurement_interval_mm'])]
+    image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+    rows = []
+    for threshold, kernel_size in itertools.product(grid['threshold'], grid['kernel_size']):
+        state = FootMaskState.from_image(image, threshold, kernel_size)
+        for heel_start_ratio, interval in itertools.product(grid['heel_start_ratio'],
+                                                            grid['measurement_interval_mm']):
+            params = (threshold, kernel_size, heel_start_ratio, interval)
+            if not state.detected:
+                rows.append((params, None, None))
+                continue
+            data = state.measure(heel_start_ratio, interval)
+            rows.append((params,
+                         data['foot_length_mm'] - scan['foot_length_mm'],
+                         data['max_width_mm'] - scan['max_width_mm']))
+    return rows
+
+
+def sweep_parameters(scans, param_grid=None, workers=None):
+    """
+    并行评估参数网格，按扫描分配到各进程
+
+    返回按 (足长MAE + 足宽MAE) 升序排列的结果列表
+    """
+    grid = dict(DEFAULT_MEASURE_PARAMS)
+    grid.update(param_grid or {})
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        per_scan = list(executor.map(_evaluate_scan, scans, itertools.repeat(grid)))
+
+    errors = {}
+    for rows in per_scan:
+        for params, length_error, width_error in rows:
+            errors.setdefault(params, []).append((length_error, width_error))
+
+    results = []
+    for (threshold, kernel_size, heel_start_ratio, interval), values in errors.items():
+        detected = np.array([v for v in values if v[0] is not None], dtype=np.float64).reshape(-1, 2)
+        abs_errors = np.abs(detected)
+        results.append({
+            'threshold': threshold,
+            'kernel_size': kernel_size,
+            'heel_start_ratio': heel_start_ratio,
+            'measurement_interval_mm': interval,
+            'length_mae_mm': float(abs_errors[:, 0].mean()) if len(detected) else None,
+            'width_mae_mm': float(abs_errors[:, 1].mean()) if len(detected) else None,
+            'length_bias_mm': float(detected[:, 0].mean()) if len(detected) else None,
+            'width_bias_mm': float(detected[:, 1].mean()) if len(detected) else None,
+            'length_max_error_mm': float(abs_errors[:, 0].max()) if len(detected) else None,
+            'width_max_error_mm': float(abs_errors[:, 1].max()) if len(detected) else None,
+            'failed': len(values) - len(detected)
+        })
+
+    results.sort(key=lambda r: (r['failed'], float('inf') if r['length_mae_mm'] is None
+                                else r['length_mae_mm'] + r['width_mae_mm']))
+    return results
+
+
+def print_sweep_report(results, top_n=10):
+    """打印误差最小的若干组参数"""
+    print("\n阈值 | 核 | 足跟比例 | 间隔(mm) | 足长MAE | 足宽MAE | 失败")
+    print("-" * 60)
+    for r in results[:top_n]:
+        if r['length_mae_mm'] is None:
+            print(f"{r['threshold']:4} | {r['kernel_size']:2} | {r['heel_start_ratio']:8.2f} | "
+                  f"{r['measurement_interval_mm']:8} |     -   |     -   | {r['failed']}")
+            continue
+        print(f"{r['threshold']:4} | {r['kernel_size']:2} | {r['heel_start_ratio']:8.2f} | "
+              f"{r['measurement_interval_mm']:8} | {r['length_mae_mm']:7.2f} | {r['width_mae_mm']:7.2f} | {r['failed']}")
@@ -0,0 +1,267 @@
+# 测量流水线结果缓存：按输入图像哈希 + 参数哈希分阶段缓存
+import os
+import json
+import pickle
+import hashlib
+import tempfile
+from collections import OrderedDict
+import cv2
+import numpy as np
+from process_foot import measure_foot
+from foot_report import ShoeSizeRecommender
+
+
+# 各阶段默认参数，参数或代码改变后对应阶段及其下游缓存自动失效
+DEFAULT_PIPELINE_PARAMS = {
+    'segment': {'backend': 'sam', 'model_type': 'vit_h', 'checkpoint': 'sam_vit_h_4b8939.pth', 'paper_offset_px': 20},
+    'warp': {'warp_width': 420},
+    'measure': {'threshold': 150, 'kernel_size': 5, 'heel_start_ratio': 0.82, 'measurement_interval_mm': 5},
+    'recommend': {}
+}
+
+_PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 缓存未命中标记，阶段结果本身可以是 None
+_MISS = object()
+
+# 各阶段实现所在的源文件，用于计算代码版本
+STAGE_SOURCES = {
+    'segment': ['pipeline_cache.py', 'seg_backends.py'],
+    'warp': ['pipeline_cache.py'],
+    'measure': ['process_foot.py'],
+    'recommend': ['foot_report.py']
+}
+
+
+def hash_file(path):
+    """计算文件内容的 SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def code_version(stage):
+    """根据阶段实现源码计算代码版本"""
+    digest = hashlib.sha256()
+    for name in STAGE_SOURCES[stage]:
+        digest.update(hash_file(os.path.join(_PACKAGE_DIR, name)).encode())
+    return digest.hexdigest()[:16]
+
+
+def stage_key(stage, parent_key, params, version):
+    """阶段缓存键 = 上游键 + 阶段名 + 参数 + 代码版本"""
+    payload = json.dumps({'stage': stage, 'parent': parent_key, 'params': params, 'code': version},
+                         sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class PipelineCache:
+    """
+    内容寻址的磁盘缓存，按总字节数做 LRU 淘汰
+
+    每个条目是一个 pickle 文件，文件修改时间即最近访问时间，
+    因此重启后仍能恢复 LRU 顺序
+    """
+
+    def __init__(self, cache_dir='result/cache', max_bytes=2 * 1024 ** 3):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.metrics = {'hits': {}, 'misses': {}, 'evictions': 0, 'bytes_written': 0}
+        os.makedirs(cache_dir, exist_ok=True)
+
+        # 按访问时间从旧到新恢复索引
+        entries = []
+        for root, _, files in os.walk(cache_dir):
+            for name in files:
+                if name.endswith('.pkl'):
+                    stat = os.stat(os.path.join(root, name))
+                    entries.append((stat.st_mtime, name[:-4], stat.st_size))
+        entries.sort()
+        self.entries = OrderedDict((key, size) for _, key, size in entries)
+        self.total_bytes = sum(self.entries.values())
+        self._evict()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + '.pkl')
+
+    def get(self, key, default=None):
+        """读取缓存，未命中返回 default"""
+        if key not in self.entries:
+            return default
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            # 文件被其他进程淘汰或损坏
+            self.total_bytes -= self.entries.pop(key)
+            return default
+        os.utime(path)
+        self.entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        """写入缓存并按容量淘汰最久未使用的条目"""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+        size = os.path.getsize(path)
+        if key in self.entries:
+            self.total_bytes -= self.entries.pop(key)
+        self.entries[key] = size
+        self.total_bytes += size
+        self.metrics['bytes_written'] += size
+        self._evict()
+
+    def _evict(self):
+        while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+            key, size = self.entries.popitem(last=False)
+            self.total_bytes -= size
+            self.metrics['evictions'] += 1
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+
+    def stage(self, stage, parent_key, params, compute):
+        """
+        运行一个带缓存的阶段
+
+        compute 为无参函数，只在未命中时调用；返回 (结果, 阶段缓存键)
+        """
+        key = stage_key(stage, parent_key, params, code_version(stage))
+        value = self.get(key, _MISS)
+        if value is not _MISS:
+            self.metrics['hits'][stage] = self.metrics['hits'].get(stage, 0) + 1
+            return value, key
+
+        self.metrics['misses'][stage] = self.metrics['misses'].get(stage, 0) + 1
+        value = compute()
+        self.put(key, value)
+        return value, key
+
+    def stats(self):
+        """命中/未命中统计与当前占用"""
+        hits = sum(self.metrics['hits'].values())
+        misses = sum(self.metrics['misses'].values())
+        return {
+            'hits': dict(self.metrics['hits']),
+            'misses': dict(self.metrics['misses']),
+            'hit_rate': hits / (hits + misses) if hits + misses else 0.0,
+            'evictions': self.metrics['evictions'],
+            'bytes_written': self.metrics['bytes_written'],
+            'entries': len(self.entries),
+            'total_bytes': self.total_bytes
+        }
+
+
+def default_predictor_factory(segment_params):
+    """按配置加载分割后端（仅在分割阶段未命中时调用）"""
+    from seg_backends import load_backend
+    return load_backend(segment_params)
+
+
+def segment_foot_and_a4(predictor, image, paper_offset_px=20):
+    """
+    点击图像中心分割足部，再点击足部顶端上方分割A4纸
+
+    返回 (center_mask, a4_mask)，均为 0/255 的 uint8 掩膜
+    """
+    predictor.set_image(image)
+
+    # 点击图像中心
+    height, width = image.shape[:2]
+    masks, _, _ = predictor.predict(
+        point_coords=np.array([[width // 2, height // 2]]),
+        point_labels=np.array([1]),
+        multimask_output=False
+    )
+    center_mask = masks[0].astype(np.uint8) * 255
+
+    # 在足部顶端上方点击A4纸
+    foot_pixels = np.where(center_mask > 0)
+    top_y = np.min(foot_pixels[0])
+    top_row_pixels = np.where(center_mask[top_y, :] > 0)[0]
+    center_x = int(np.mean(top_row_pixels))
+    paper_y = max(0, top_y - paper_offset_px)
+    masks, _, _ = predictor.predict(
+        point_coords=np.array([[center_x, paper_y]]),
+        point_labels=np.array([1]),
+        multimask_output=False
+    )
+    a4_mask = masks[0].astype(np.uint8) * 255
+    return center_mask, a4_mask
+
+
+def warp_a4(a4_mask, warp_width=420):
+    """根据A4纸掩膜的四个角点做透视变换，返回校正后的 BGR 图像"""
+    y_coords, x_coords = np.where(a4_mask > 0)
+    top_left = [x_coords[np.argmin(x_coords + y_coords)], y_coords[np.argmin(x_coords + y_coords)]]
+    top_right = [x_coords[np.argmax(x_coords - y_coords)], y_coords[np.argmax(x_coords - y_coords)]]
+    bottom_left = [x_coords[np.argmin(x_coords - y_coords)], y_coords[np.argmin(x_coords - y_coords)]]
+    bottom_right = [x_coords[np.argmax(x_coords + y_coords)], y_coords[np.argmax(x_coords + y_coords)]]
+    corners = np.array([top_left, top_right, bottom_right, bottom_left], dtype=np.float32)
+
+    warp_height = int(warp_width * 29.7 / 21)  # A4比例
+    dst_corners = np.array([
+        [0, 0],
+        [warp_width - 1, 0],
+        [warp_width - 1, warp_height - 1],
+        [0, warp_height - 1]
+    ], dtype=np.float32)
+
+    transform_matrix = cv2.getPerspectiveTransform(corners, dst_corners)
+    warped_image = cv2.warpPerspective(a4_mask, transform_matrix, (warp_width, warp_height))
+    return cv2.cvtColor(warped_image, cv2.COLOR_GRAY2BGR)
+
+
+def run_cached_pipeline(image_path, cache, params=None, predictor_factory=default_predictor_factory):
+    """
+    带缓存地运行 分割 → 透视校正 → 测量 → 鞋码推荐
+
+    params 只需给出与 DEFAULT_PIPELINE_PARAMS 不同的部分；
+    某阶段参数改变时，其上游阶段仍直接复用缓存
+    """
+    stage_params = {stage: dict(values) for stage, values in DEFAULT_PIPELINE_PARAMS.items()}
+    for stage, values in (params or {}).items():
+        stage_params[stage].update(values)
+
+    image_key = hash_file(image_path)
+
+    def segment():
+        image = cv2.cvtColor(cv2.imread(image_path), cv2.COLOR_BGR2RGB)
+        predictor = predictor_factory(stage_params['segment'])
+        return segment_foot_and_a4(predictor, image, stage_params['segment']['paper_offset_px'])
+
+    (center_mask, a4_mask), segment_key = cache.stage('segment', image_key, stage_params['segment'], segment)
+
+    warped_image, warp_key = cache.stage(
+        'warp', segment_key, stage_params['warp'],
+        lambda: warp_a4(a4_mask, stage_params['warp']['warp_width']))
+
+    measurement_data, measure_key = cache.stage(
+        'measure', warp_key, stage_params['measure'],
+        lambda: measure_foot(cv2.cvtColor(warped_image, cv2.COLOR_BGR2RGB), **stage_params['measure']))
+
+    if measurement_data is None:
+        print("❌ 未检测到足部，跳过鞋码推荐")
+        report = None
+    else:
+        report, _ = cache.stage(
+            'recommend', measure_key, stage_params['recommend'],
+            lambda: ShoeSizeRecommender().generate_comprehensive_report(
+                measurement_data['foot_length_mm'], measurement_data['max_width_mm']))
+
+    return {
+        'center_mask': center_mask,
+        'a4_mask': a4_mask,
+        'warped_image': warped_image,
+        'measurement_data': measurement_data,
+        'report': report
+    }
@@ -5,7 +5,215 @@ import matplotlib.pyplot as plt
 import json
 
 
-def process_foot_measurement(image_path="result\warped_a4.png", save_results=True):
+# A4纸实际尺寸 (毫米)
+A4_WIDTH_MM = 210
+A4_HEIGHT_MM = 297
+
+
+def detect_foot_mask(warped_image, threshold=150, kernel_size=5):
+    """阈值分割 + 形态学处理，得到原始足部掩膜（输入为 RGB 图像）"""
+    gray_warped = cv2.cvtColor(warped_image, cv2.COLOR_RGB2GRAY)
+    _, foot_threshold = cv2.threshold(gray_warped, threshold, 255, cv2.THRESH_BINARY_INV)
+    
+    # 形态学处理
+    kernel = np.ones((kernel_size, kernel_size), np.uint8)
+    foot_clean = cv2.morphologyEx(foot_threshold, cv2.MORPH_CLOSE, kernel)
+    foot_clean = cv2.morphologyEx(foot_clean, cv2.MORPH_OPEN, kernel)
+    return foot_clean
+
+
+class FootMaskState:
+    """
+    测量中间状态：清理后的掩膜、按行排列的足部像素、每行左右边界和轮廓
+    
+    足后跟椭圆修正和宽度采样只依赖该状态，
+    调整 heel_start_ratio 或 measurement_interval_mm 时无需重新读图和形态学处理
+    """
+    
+    def __init__(self, foot_clean):
+        self.foot_clean = foot_clean
+        self.height, self.width = foot_clean.shape[:2]
+        
+        # 计算像素到毫米的转换比例
+        self.pixel_to_mm_x = A4_WIDTH_MM / self.width
+        self.pixel_to_mm_y = A4_HEIGHT_MM / self.height
+        
+        # 足部像素按行优先顺序排列，row_ptr 为每行在数组中的起止位置
+        self.ys, self.xs = np.nonzero(foot_clean)
+        self.row_ptr = np.searchsorted(self.ys, np.arange(self.height + 1))
+        
+        # 每行最左/最右的足部像素，-1 表示该行没有足部
+        has_pixels = self.row_ptr[1:] > self.row_ptr[:-1]
+        self.row_left = np.full(self.height, -1, dtype=np.int64)
+        self.row_right = np.full(self.height, -1, dtype=np.int64)
+        self.row_left[has_pixels] = self.xs[self.row_ptr[:-1][has_pixels]]
+        self.row_right[has_pixels] = self.xs[self.row_ptr[1:][has_pixels] - 1]
+        
+        self.detected = len(self.ys) > 0
+        if self.detected:
+            self.top_y = int(self.ys[0])
+            self.bottom_y = int(self.ys[-1])
+        
+        self._contour = None
+        self._heel_cache = {}
+    
+    @classmethod
+    def from_image(cls, warped_image, threshold=150, kernel_size=5):
+        return cls(detect_foot_mask(warped_image, threshold, kernel_size))
+    
+    @property
+    def contour(self):
+        """足部最大外轮廓（首次访问时计算）"""
+        if self._contour is None and self.detected:
+            contours, _ = cv2.findContours(self.foot_clean, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_NONE)
+            self._contour = max(contours, key=cv2.contourArea)
+        return self._contour
+    
+    def _heel_ellipse(self, heel_start_ratio):
+        """
+        计算足后跟区域每个像素是否落在修正椭圆内
+        
+        返回 (heel_start_y, inside)，inside 对应 ys/xs 中从 heel_start_y 行开始的像素；
+        heel_start_y 为 None 表示无法修正
+        """
+        if heel_start_ratio in self._heel_cache:
+            return self._heel_cache[heel_start_ratio]
+        
+        foot_length_pixels = self.bottom_y - self.top_y
+        heel_start_y = int(self.top_y + foot_length_pixels * heel_start_ratio)
+        
+        # 在足后跟开始线处找到足部宽度
+        if self.row_left[heel_start_y] < 0:
+            result = (None, None)
+        else:
+            left_x = self.row_left[heel_start_y]
+            right_x = self.row_right[heel_start_y]
+            
+            # 椭圆参数
+            ellipse_center_x = (left_x + right_x) / 2
+            ellipse_center_y = heel_start_y
+            ellipse_width = right_x - left_x
+            ellipse_height = 2 * (self.height - 1 - heel_start_y)
+            
+            start = self.row_ptr[heel_start_y]
+            heel_x = self.xs[start:]
+            heel_y = self.ys[start:]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                inside = ((heel_x - ellipse_center_x)**2 / (ellipse_width/2)**2 + 
+                          (heel_y - ellipse_center_y)**2 / (ellipse_height/2)**2) <= 1
+            result = (heel_start_y, inside)
+        
+        self._heel_cache[heel_start_ratio] = result
+        return result
+    
+    def corrected_extents(self, heel_start_ratio=0.82):
+        """足后跟区域只保留椭圆内部分后，每行的左右边界"""
+        heel_start_y, inside = self._heel_ellipse(heel_start_ratio)
+        if heel_start_y is None:
+            return self.row_left, self.row_right, None
+        
+        left = self.row_left.copy()
+        right = self.row_right.copy()
+        left[heel_start_y:] = -1
+        right[heel_start_y:] = -1
+        
+        start = self.row_ptr[heel_start_y]
+        kept_y = self.ys[start:][inside]
+        kept_x = self.xs[start:][inside]
+        if len(kept_y) > 0:
+            rows, first = np.unique(kept_y, return_index=True)
+            last = np.searchsorted(kept_y, rows, side='right') - 1
+            left[rows] = kept_x[first]
+            right[rows] = kept_x[last]
+        return left, right, heel_start_y
+    
+    def modified_mask(self, heel_start_ratio=0.82):
+        """生成椭圆修正后的足部掩膜图像"""
+        heel_start_y, inside = self._heel_ellipse(heel_start_ratio)
+        if heel_start_y is None:
+            return self.foot_clean
+        
+        modified_mask = self.foot_clean.copy()
+        start = self.row_ptr[heel_start_y]
+        modified_mask[self.ys[start:][~inside], self.xs[start:][~inside]] = 0
+        return modified_mask
+    
+    def measure_rows(self, heel_start_ratio=0.82, measurement_interval_mm=5):
+        """
+        每隔 measurement_interval_mm 采样足宽
+        
+        返回测量数据字典，另附绘图用的 measurement_y_pixels / heel_start_y / top_y
+        """
+        left, right, heel_start_y = self.corrected_extents(heel_start_ratio)
+        
+        # 重新计算修正后的足部范围
+        valid_rows = np.nonzero(left >= 0)[0]
+        top_y = int(valid_rows[0])
+        bottom_y = int(valid_rows[-1])
+        foot_length_pixels = bottom_y - top_y
+        foot_length_mm = foot_length_pixels * self.pixel_to_mm_y
+        
+        num_measurements = int(foot_length_mm / measurement_interval_mm) + 1
+        distances_mm = [i * measurement_interval_mm for i in range(num_measurements)]
+        current_y = (top_y + np.asarray(distances_mm) / self.pixel_to_mm_y).astype(int)
+        
+        # 只保留足跟线之前、且该行有足部像素的位置
+        keep = current_y < bottom_y
+        keep[keep] &= left[current_y[keep]] >= 0
+        keep_idx = np.nonzero(keep)[0]
+        rows = current_y[keep_idx]
+        
+        left_x = left[rows]
+        right_x = right[rows]
+        widths_mm = (right_x - left_x) * self.pixel_to_mm_x
+        positions_mm = [distances_mm[i] for i in keep_idx]
+        
+        if len(widths_mm) > 0:
+            max_width_idx = int(np.argmax(widths_mm))
+            max_width_mm = float(widths_mm[max_width_idx])
+            max_width_position = positions_mm[max_width_idx]
+        else:
+            max_width_mm = 0
+            max_width_position = 0
+        
+        measurement_data = {
+            'positions_mm': positions_mm,
+            'widths_mm': widths_mm.tolist(),
+            'left_edge_points_mm': (left_x * self.pixel_to_mm_x).tolist(),
+            'right_edge_points_mm': (right_x * self.pixel_to_mm_x).tolist(),
+            'center_points_mm': ((left_x + right_x) / 2 * self.pixel_to_mm_x).tolist(),
+            'foot_length_mm': foot_length_mm,
+            'max_width_mm': max_width_mm,
+            'max_width_position_mm': max_width_position,
+            'measurement_interval_mm': measurement_interval_mm,
+            'heel_correction_applied': heel_start_y is not None
+        }
+        geometry = {
+            'measurement_y_pixels': rows.tolist(),
+            'heel_start_y': heel_start_y,
+            'top_y': top_y
+        }
+        return measurement_data, geometry
+    
+    def measure(self, heel_start_ratio=0.82, measurement_interval_mm=5):
+        """只返回测量数据（与 foot_measurements.json 格式一致）"""
+        return self.measure_rows(heel_start_ratio, measurement_interval_mm)[0]
+
+
+def measure_foot(warped_image, threshold=150, kernel_size=5, heel_start_ratio=0.82, measurement_interval_mm=5):
+    """
+    无绘图、无文件输出的测量，输入为透视校正后的 RGB 图像
+    
+    未检测到足部时返回 None
+    """
+    state = FootMaskState.from_image(warped_image, threshold, kernel_size)
+    if not state.detected:
+        return None
+    return state.measure(heel_start_ratio, measurement_interval_mm)
+
+
+def process_foot_measurement(image_path="result\warped_a4.png", save_results=True,
+                             threshold=150, kernel_size=5, heel_start_ratio=0.82, measurement_interval_mm=5):
     """
     整合的足部测量函数：椭圆修正 + 详细测量
     """
@@ -17,140 +225,51 @@ def process_foot_measurement(image_path="result\warped_a4.png", save_results=Tru
     warped_image = cv2.imread(image_path)
     warped_image = cv2.cvtColor(warped_image, cv2.COLOR_BGR2RGB)
     
-    # 获取图像尺寸
-    height, width = warped_image.shape[:2]
-    
-    # A4纸实际尺寸 (毫米)
-    A4_WIDTH_MM = 210
-    A4_HEIGHT_MM = 297
-    
-    # 计算像素到毫米的转换比例
-    pixel_to_mm_x = A4_WIDTH_MM / width
-    pixel_to_mm_y = A4_HEIGHT_MM / height
-    
     # ========== 第一步：检测和修正足部掩膜 ==========
     print("🔍 步骤1: 检测足部...")
-    gray_warped = cv2.cvtColor(warped_image, cv2.COLOR_RGB2GRAY)
-    _, foot_threshold = cv2.threshold(gray_warped, 150, 255, cv2.THRESH_BINARY_INV)
-    
-    # 形态学处理
-    kernel = np.ones((5,5), np.uint8)
-    foot_clean = cv2.morphologyEx(foot_threshold, cv2.MORPH_CLOSE, kernel)
-    foot_clean = cv2.morphologyEx(foot_clean, cv2.MORPH_OPEN, kernel)
-    
-    # 找到足部像素
-    foot_pixels = np.where(foot_clean > 0)
+    state = FootMaskState.from_image(warped_image, threshold, kernel_size)
+    foot_clean = state.foot_clean
+    pixel_to_mm_x = state.pixel_to_mm_x
+    pixel_to_mm_y = state.pixel_to_mm_y
     
-    if len(foot_pixels[0]) == 0:
+    if not state.detected:
         print("❌ 未检测到足部")
         return None
     
-    # 计算基本参数
-    top_y = np.min(foot_pixels[0])
-    bottom_y = np.max(foot_pixels[0])
-    foot_length_pixels = bottom_y - top_y
-    foot_length_mm = foot_length_pixels * pixel_to_mm_y
-    
+    foot_length_mm = (state.bottom_y - state.top_y) * pixel_to_mm_y
     print(f"✅ 检测到足部，足长: {foot_length_mm:.1f} mm")
     
     # ========== 第二步：椭圆修正足后跟 ==========
     print("🔧 步骤2: 椭圆修正足后跟区域...")
+    modified_mask = state.modified_mask(heel_start_ratio)
     
-    # 计算足后跟开始线（82%位置）
-    heel_start_y = int(top_y + foot_length_pixels * 0.82)
-    
-    # 在足后跟开始线处找到足部宽度
-    foot_pixels_at_heel_start = np.where(foot_clean[heel_start_y, :] > 0)[0]
-    if len(foot_pixels_at_heel_start) > 0:
-        left_x = np.min(foot_pixels_at_heel_start)
-        right_x = np.max(foot_pixels_at_heel_start)
-        
-        # 椭圆参数
-        ellipse_center_x = (left_x + right_x) / 2
-        ellipse_center_y = heel_start_y
-        ellipse_width = right_x - left_x
-        ellipse_height = 2 * (height - 1 - heel_start_y)
-        
-        # 创建椭圆掩膜
-        y_coords, x_coords = np.ogrid[:height, :width]
-        ellipse_mask = ((x_coords - ellipse_center_x)**2 / (ellipse_width/2)**2 + 
-                       (y_coords - ellipse_center_y)**2 / (ellipse_height/2)**2) <= 1
-        
-        # 创建足后跟区域掩膜
-        heel_region_mask = y_coords >= heel_start_y
-        
-        # 修改掩膜：足后跟区域只保留椭圆内的部分
-        modified_mask = foot_clean.copy()
-        heel_outside_ellipse = heel_region_mask & (~ellipse_mask)
-        modified_mask[heel_outside_ellipse] = 0
-        
+    # ========== 第三步：详细测量 ==========
+    print(f"\n📏 步骤3: 每{measurement_interval_mm}mm测量足宽...")
+    measurement_data, geometry = state.measure_rows(heel_start_ratio, measurement_interval_mm)
+    heel_start_y = geometry['heel_start_y']
+    top_y = geometry['top_y']
+    if heel_start_y is not None:
         print(f"✅ 椭圆修正完成（足后跟起始位置: {heel_start_y}px）")
     else:
-        modified_mask = foot_clean
         print("⚠️ 无法进行椭圆修正，使用原始掩膜")
     
-    # ========== 第三步：详细测量 ==========
-    print("\n📏 步骤3: 每5mm测量足宽...")
-    
-    # 重新计算修正后的足部范围
-    foot_pixels_modified = np.where(modified_mask > 0)
-    top_y = np.min(foot_pixels_modified[0])
-    bottom_y = np.max(foot_pixels_modified[0])
-    foot_length_pixels = bottom_y - top_y
-    foot_length_mm = foot_length_pixels * pixel_to_mm_y
-    
-    # 测量参数
-    measurement_interval_mm = 5  # 5毫米间隔
-    measurement_interval_pixels = measurement_interval_mm / pixel_to_mm_y
-    num_measurements = int(foot_length_mm / measurement_interval_mm) + 1
-    
-    # 存储测量结果
-    measurement_positions_mm = []
-    measurement_widths_mm = []
-    measurement_y_pixels = []
-    left_edge_points_mm = []
-    right_edge_points_mm = []
-    center_points_mm = []
+    foot_length_mm = measurement_data['foot_length_mm']
+    measurement_positions_mm = measurement_data['positions_mm']
+    measurement_widths_mm = measurement_data['widths_mm']
+    measurement_y_pixels = geometry['measurement_y_pixels']
+    left_edge_points_mm = measurement_data['left_edge_points_mm']
+    right_edge_points_mm = measurement_data['right_edge_points_mm']
+    center_points_mm = measurement_data['center_points_mm']
     
     print("\n距脚尖距离(mm) | 足宽(mm) | 足宽(cm)")
     print("-" * 40)
-    
-    for i in range(num_measurements):
-        distance_from_top_mm = i * measurement_interval_mm
-        distance_from_top_pixels = distance_from_top_mm / pixel_to_mm_y
-        current_y = int(top_y + distance_from_top_pixels)
-        
-        if current_y >= bottom_y:
-            break
-        
-        # 在当前行找足部像素（使用修正后的掩膜）
-        foot_pixels_in_row = np.where(modified_mask[current_y, :] > 0)[0]
-        
-        if len(foot_pixels_in_row) > 0:
-            left_x = np.min(foot_pixels_in_row)
-            right_x = np.max(foot_pixels_in_row)
-            width_pixels = right_x - left_x
-            width_mm = width_pixels * pixel_to_mm_x
-            
-            measurement_positions_mm.append(distance_from_top_mm)
-            measurement_widths_mm.append(width_mm)
-            measurement_y_pixels.append(current_y)
-            
-            # 记录左右边缘和中心点（单位：毫米）
-            left_edge_mm = left_x * pixel_to_mm_x
-            right_edge_mm = right_x * pixel_to_mm_x
-            center_mm = ((left_x + right_x) / 2) * pixel_to_mm_x
-            left_edge_points_mm.append(left_edge_mm)
-            right_edge_points_mm.append(right_edge_mm)
-            center_points_mm.append(center_mm)
-            
-            print(f"{distance_from_top_mm:8.1f}      | {width_mm:7.1f} | {width_mm/10:6.2f}")
+    for distance_from_top_mm, width_mm in zip(measurement_positions_mm, measurement_widths_mm):
+        print(f"{distance_from_top_mm:8.1f}      | {width_mm:7.1f} | {width_mm/10:6.2f}")
     
     # 找到最宽的位置
     if measurement_widths_mm:
-        max_width_mm = max(measurement_widths_mm)
-        max_width_idx = measurement_widths_mm.index(max_width_mm)
-        max_width_position = measurement_positions_mm[max_width_idx]
+        max_width_mm = measurement_data['max_width_mm']
+        max_width_position = measurement_data['max_width_position_mm']
         
         print(f"\n🎯 最宽位置: 距脚尖 {max_width_position:.1f}mm 处，宽度 {max_width_mm:.1f}mm")
 
@@ -174,7 +293,7 @@ def process_foot_measurement(image_path="result\warped_a4.png", save_results=Tru
     # 子图3: 修正后掩膜
     plt.subplot(2, 3, 2)
     plt.imshow(modified_mask, cmap='gray')
-    if 'heel_start_y' in locals():
+    if heel_start_y is not None:
         plt.axhline(y=heel_start_y, color='blue', linewidth=2, linestyle='--')
     plt.title("椭圆修正后掩膜")
     plt.axis('off')
@@ -220,13 +339,13 @@ def process_foot_measurement(image_path="result\warped_a4.png", save_results=Tru
         plt.plot(max_width_position, max_width_mm, 'ro', markersize=7, label='最宽处')
         
         # 标记足后跟起始位置
-        if 'heel_start_y' in locals():
+        if heel_start_y is not None:
             heel_start_mm = (heel_start_y - top_y) * pixel_to_mm_y
             plt.axvline(x=heel_start_mm, color='blue', linestyle='--', alpha=0.7, label='足后跟起始')
     
     plt.xlabel('距脚尖距离 (mm)')
     plt.ylabel('足宽 (mm)')
-    plt.title('足部宽度变化曲线 (每5mm测量)')
+    plt.title(f'足部宽度变化曲线 (每{measurement_interval_mm}mm测量)')
     plt.grid(True, alpha=0.3)
     plt.legend()
     
@@ -258,19 +377,6 @@ def process_foot_measurement(image_path="result\warped_a4.png", save_results=Tru
         print(f"\n💾 修正后的掩膜已保存到 result\modified_foot_mask.png")
         
         # 保存测量数据
-        measurement_data = {
-            'positions_mm': measurement_positions_mm,
-            'widths_mm': measurement_widths_mm,
-            'left_edge_points_mm': left_edge_points_mm,
-            'right_edge_points_mm': right_edge_points_mm,
-            'center_points_mm': center_points_mm,
-            'foot_length_mm': foot_length_mm,
-            'max_width_mm': max_width_mm if measurement_widths_mm else 0,
-            'max_width_position_mm': max_width_position if measurement_widths_mm else 0,
-            'measurement_interval_mm': measurement_interval_mm,
-            'heel_correction_applied': 'heel_start_y' in locals()
-        }
-        
         with open('result\\foot_measurements.json', 'w') as f:
             json.dump(measurement_data, f, indent=2)
         
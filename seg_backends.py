@@ -0,0 +1,363 @@
+# 分割模型后端：SAM / 轻量蒸馏模型 / ONNX CPU 推理 / 桩模型，按配置选择
+import os
+import time
+import multiprocessing
+import cv2
+import numpy as np
+from pipeline_cache import segment_foot_and_a4, warp_a4
+from process_foot import measure_foot
+
+try:
+    import resource
+except ImportError:  # Windows 没有 resource 模块
+    resource = None
+
+
+# 后端名称 -> 后端类
+BACKEND_REGISTRY = {}
+
+
+def register_backend(name):
+    """注册分割后端的装饰器"""
+    def decorator(cls):
+        BACKEND_REGISTRY[name] = cls
+        return cls
+    return decorator
+
+
+def load_backend(config):
+    """
+    按配置创建分割后端，例如：
+    {"backend": "sam", "model_type": "vit_b", "checkpoint": "sam_vit_b_01ec64.pth"}
+
+    所有后端都提供与 SamPredictor 相同的 set_image / predict 接口
+    """
+    if isinstance(config, str):
+        config = {'backend': config}
+    name = config.get('backend', 'sam')
+    if name not in BACKEND_REGISTRY:
+        raise ValueError(f"未知的分割后端: {name}，可选: {sorted(BACKEND_REGISTRY)}")
+    return BACKEND_REGISTRY[name](config)
+
+
+@register_backend('sam')
+class SamBackend:
+    """Meta SAM (vit_h / vit_l / vit_b)"""
+
+    package = 'segment_anything'
+    default_model_type = 'vit_h'
+    default_checkpoint = 'sam_vit_h_4b8939.pth'
+
+    def __init__(self, config):
+        module = __import__(self.package, fromlist=['sam_model_registry', 'SamPredictor'])
+        model_type = config.get('model_type', self.default_model_type)
+        checkpoint = config.get('checkpoint', self.default_checkpoint)
+        model = module.sam_model_registry[model_type](checkpoint=checkpoint)
+        model.to(device=config.get('device', 'cpu'))
+        self.predictor = module.SamPredictor(model)
+
+    def set_image(self, image):
+        self.predictor.set_image(image)
+
+    def predict(self, point_coords, point_labels, multimask_output=False):
+        return self.predictor.predict(point_coords=point_coords, point_labels=point_labels,
+                                      multimask_output=multimask_output)
+
+
+@register_backend('mobile_sam')
+class MobileSamBackend(SamBackend):
+    """MobileSAM 蒸馏编码器 (vit_t)，接口与 SAM 相同"""
+
+    package = 'mobile_sam'
+    default_model_type = 'vit_t'
+    default_checkpoint = 'mobile_sam.pt'
+
+
+@register_backend('onnx')
+class OnnxSamBackend:
+    """
+    onnxruntime CPU 推理：编码器 + SAM 官方导出的提示解码器
+
+    quantize=True 时对编码器做 int8 动态量化（首次使用时生成 *.int8.onnx）
+    """
+
+    image_size = 1024
+    pixel_mean = np.array([123.675, 116.28, 103.53], dtype=np.float32)
+    pixel_std = np.array([58.395, 57.12, 57.375], dtype=np.float32)
+
+    def __init__(self, config):
+        import onnxruntime
+
+        encoder_path = config.get('encoder_path', 'sam_vit_b_encoder.onnx')
+        decoder_path = config.get('decoder_path', 'sam_vit_b_decoder.onnx')
+        if config.get('quantize', False):
+            encoder_path = self._quantized(encoder_path)
+
+        options = onnxruntime.SessionOptions()
+        if config.get('threads'):
+            options.intra_op_num_threads = config['threads']
+        providers = ['CPUExecutionProvider']
+        self.encoder = onnxruntime.InferenceSession(encoder_path, options, providers=providers)
+        self.decoder = onnxruntime.InferenceSession(decoder_path, options, providers=providers)
+        self.encoder_input = self.encoder.get_inputs()[0].name
+
+    @staticmethod
+    def _quantized(encoder_path):
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        quantized_path = encoder_path.replace('.onnx', '.int8.onnx')
+        if not os.path.exists(quantized_path):
+            print(f"🔧 量化编码器: {encoder_path} -> {quantized_path}")
+            quantize_dynamic(encoder_path, quantized_path, weight_type=QuantType.QUInt8)
+        return quantized_path
+
+    def set_image(self, image):
+        """缩放最长边到1024、归一化并补零，计算图像嵌入"""
+        self.original_size = image.shape[:2]
+        height, width = self.original_size
+        self.scale = self.image_size / max(height, width)
+        new_height = int(height * self.scale + 0.5)
+        new_width = int(width * self.scale + 0.5)
+
+        resized = cv2.resize(image, (new_width, new_height)).astype(np.float32)
+        normalized = (resized - self.pixel_mean) / self.pixel_std
+        padded = np.zeros((self.image_size, self.image_size, 3), dtype=np.float32)
+        padded[:new_height, :new_width] = normalized
+        tensor = padded.transpose(2, 0, 1)[None]
+
+        self.embeddings = self.encoder.run(None, {self.encoder_input: tensor})[0]
+
+    def predict(self, point_coords, point_labels, multimask_output=False):
+        # 官方导出的解码器需要额外的填充点（标签 -1）
+        coords = np.concatenate([point_coords, np.zeros((1, 2))], axis=0)[None].astype(np.float32)
+        labels = np.concatenate([point_labels, np.array([-1])])[None].astype(np.float32)
+        coords = coords * self.scale
+
+        masks, scores, low_res_logits = self.decoder.run(None, {
+            'image_embeddings': self.embeddings,
+            'point_coords': coords,
+            'point_labels': labels,
+            'mask_input': np.zeros((1, 1, 256, 256), dtype=np.float32),
+            'has_mask_input': np.zeros(1, dtype=np.float32),
+            'orig_im_size': np.array(self.original_size, dtype=np.float32)
+        })
+        return masks[0] > 0.0, scores[0], low_res_logits[0]
+
+
+@register_backend('stub')
+class StubBackend:
+    """
+    无模型的桩后端：以点击点颜色为种子做漫水填充
+
+    用于在没有模型权重的环境中跑通评测流程
+    """
+
+    def __init__(self, config):
+        self.tolerance = config.get('tolerance', 12)
+        self.blur = config.get('blur', 5)
+
+    def set_image(self, image):
+        self.image = cv2.GaussianBlur(image, (self.blur, self.blur), 0) if self.blur else image.copy()
+
+    def predict(self, point_coords, point_labels, multimask_output=False):
+        height, width = self.image.shape[:2]
+        x, y = (int(v) for v in point_coords[0])
+        flood_mask = np.zeros((height + 2, width + 2), np.uint8)
+        tolerance = (self.tolerance,) * 3
+        # 固定范围：与种子点颜色比较，避免沿渐变蔓延到整张图
+        cv2.floodFill(self.image.copy(), flood_mask, (x, y), (0, 0, 0), tolerance, tolerance,
+                      cv2.FLOODFILL_MASK_ONLY | cv2.FLOODFILL_FIXED_RANGE | (255 << 8) | 4)
+        mask = flood_mask[1:-1, 1:-1] > 0
+        return mask[None], np.array([1.0]), None
+
+
+# ========== 评测：编码延迟 / 峰值内存 / 掩膜IoU / 下游测量误差 ==========
+
+class _TimedPredictor:
+    """记录 set_image（编码器）与 predict（解码器）耗时"""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.encoder_s = []
+        self.decoder_s = []
+
+    def set_image(self, image):
+        start = time.perf_counter()
+        self.backend.set_image(image)
+        self.encoder_s.append(time.perf_counter() - start)
+
+    def predict(self, **kwargs):
+        start = time.perf_counter()
+        result = self.backend.predict(**kwargs)
+        self.decoder_s.append(time.perf_counter() - start)
+        return result
+
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    # Linux 下 ru_maxrss 单位为 KB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def mask_iou(pred_mask, true_mask):
+    """
+    计算掩膜 IoU
+
+    标注与预测宽高比一致但分辨率不同时，将标注按最近邻缩放到预测尺寸
+    """
+    if true_mask.shape[:2] != pred_mask.shape[:2]:
+        pred_h, pred_w = pred_mask.shape[:2]
+        true_h, true_w = true_mask.shape[:2]
+        if abs(pred_w / pred_h - true_w / true_h) > 0.01 * (pred_w / pred_h):
+            raise ValueError(f"标注掩膜尺寸 {true_w}x{true_h} 与图像尺寸 {pred_w}x{pred_h} 的宽高比不一致")
+        true_mask = cv2.resize(true_mask, (pred_w, pred_h), interpolation=cv2.INTER_NEAREST)
+    pred = pred_mask > 0
+    true = true_mask > 0
+    union = np.logical_or(pred, true).sum()
+    return float(np.logical_and(pred, true).sum() / union) if union else 1.0
+
+
+def _benchmark_one(config, scans, warmup):
+    """在当前进程中评测单个后端"""
+    start = time.perf_counter()
+    timed = _TimedPredictor(load_backend(config))
+    load_s = time.perf_counter() - start
+
+    records = []
+    for i, scan in enumerate(scans):
+        image = cv2.cvtColor(cv2.imread(scan['image_path']), cv2.COLOR_BGR2RGB)
+        if i == 0:
+            for _ in range(warmup):
+                timed.set_image(image)
+            timed.encoder_s.clear()
+
+        record = {'image_path': scan['image_path']}
+        try:
+            center_mask, a4_mask = segment_foot_and_a4(timed, image)
+        except ValueError:
+            # 足部掩膜为空：记为失败，IoU 按 0 计
+            center_mask = a4_mask = None
+        if scan.get('foot_mask_path'):
+            record['iou'] = 0.0 if center_mask is None else mask_iou(
+                center_mask, cv2.imread(scan['foot_mask_path'], cv2.IMREAD_GRAYSCALE))
+
+        data = None
+        if a4_mask is not None:
+            try:
+                warped_image = warp_a4(a4_mask)
+            except (ValueError, cv2.error):
+                # A4纸掩膜为空或退化，无法透视校正
+                warped_image = None
+            if warped_image is not None:
+                data = measure_foot(cv2.cvtColor(warped_image, cv2.COLOR_BGR2RGB))
+        record['foot_length_mm'] = data['foot_length_mm'] if data else None
+        record['max_width_mm'] = data['max_width_mm'] if data else None
+        records.append(record)
+
+    return {
+        'load_s': load_s,
+        'encoder_ms': [s * 1000 for s in timed.encoder_s],
+        'decoder_ms': [s * 1000 for s in timed.decoder_s],
+        'peak_rss_mb': _peak_rss_mb(),
+        'records': records
+    }
+
+
+def _mean(values):
+    values = [v for v in values if v is not None]
+    return float(np.mean(values)) if values else None
+
+
+def benchmark_backends(configs, scans, warmup=1, isolate=True):
+    """
+    依次评测多个后端配置
+
+    scans 每项包含 image_path，可选 foot_mask_path（足部掩膜标注）、
+    foot_length_mm / max_width_mm（测量真值）。
+    isolate=True 时每个后端在独立子进程中运行，峰值内存互不影响。
+    第一个配置作为参考，其余后端同时报告与其测量结果的差异。
+    """
+    results = []
+    for config in configs:
+        name = config.get('name') or f"{config.get('backend', 'sam')}:{config.get('model_type', '')}".rstrip(':')
+        print(f"⏱️ 评测后端 {name} ...")
+        if isolate:
+            with multiprocessing.get_context('spawn').Pool(1) as pool:
+                raw = pool.apply(_benchmark_one, (config, scans, warmup))
+        else:
+            raw = _benchmark_one(config, scans, warmup)
+
+        length_errors, width_errors = [], []
+        for scan, record in zip(scans, raw['records']):
+            if record['foot_length_mm'] is None:
+                continue
+            if 'foot_length_mm' in scan:
+                length_errors.append(abs(record['foot_length_mm'] - scan['foot_length_mm']))
+            if 'max_width_mm' in scan:
+                width_errors.append(abs(record['max_width_mm'] - scan['max_width_mm']))
+
+        results.append({
+            'name': name,
+            'config': config,
+            'load_s': raw['load_s'],
+            'encoder_ms': _mean(raw['encoder_ms']),
+            'encoder_p95_ms': float(np.percentile(raw['encoder_ms'], 95)) if raw['encoder_ms'] else None,
+            'decoder_ms': _mean(raw['decoder_ms']),
+            'peak_rss_mb': raw['peak_rss_mb'],
+            'mean_iou': _mean([r.get('iou') for r in raw['records']]),
+            'length_mae_mm': _mean(length_errors),
+            'width_mae_mm': _mean(width_errors),
+            'failed': sum(r['foot_length_mm'] is None for r in raw['records']),
+            'records': raw['records']
+        })
+
+    # 与参考后端的下游测量差异
+    reference = results[0]['records'] if results else []
+    for result in results:
+        length_deltas, width_deltas = [], []
+        for ref, record in zip(reference, result['records']):
+            if ref['foot_length_mm'] is None or record['foot_length_mm'] is None:
+                continue
+            length_deltas.append(abs(record['foot_length_mm'] - ref['foot_length_mm']))
+            width_deltas.append(abs(record['max_width_mm'] - ref['max_width_mm']))
+        result['length_delta_vs_ref_mm'] = _mean(length_deltas)
+        result['width_delta_vs_ref_mm'] = _mean(width_deltas)
+
+    return results
+
+
+def select_backend(results, min_iou=None, max_length_error_mm=None, max_width_error_mm=None):
+    """
+    选出满足精度要求、编码延迟最低的后端
+
+    误差优先与真值比较；没有真值时使用与参考后端的差异
+    """
+    def meets(result):
+        if result['failed']:
+            return False
+        if min_iou is not None and (result['mean_iou'] is None or result['mean_iou'] < min_iou):
+            return False
+        for limit, key, fallback in ((max_length_error_mm, 'length_mae_mm', 'length_delta_vs_ref_mm'),
+                                     (max_width_error_mm, 'width_mae_mm', 'width_delta_vs_ref_mm')):
+            error = result[key] if result[key] is not None else result[fallback]
+            if limit is not None and (error is None or error > limit):
+                return False
+        return True
+
+    candidates = [r for r in results if r['encoder_ms'] is not None and meets(r)]
+    if not candidates:
+        return None
+    return min(candidates, key=lambda r: r['encoder_ms'])
+
+
+def print_benchmark_report(results):
+    """打印各后端评测结果"""
+    def fmt(value, spec='.1f'):
+        return '-' if value is None else format(value, spec)
+
+    print("\n后端 | 编码(ms) | 解码(ms) | 峰值内存(MB) | IoU | 足长MAE | 足宽MAE | 与参考差异(长/宽)")
+    print("-" * 96)
+    for r in results:
+        print(f"{r['name']} | {fmt(r['encoder_ms'])} | {fmt(r['decoder_ms'])} | {fmt(r['peak_rss_mb'])} | "
+              f"{fmt(r['mean_iou'], '.3f')} | {fmt(r['length_mae_mm'], '.2f')} | {fmt(r['width_mae_mm'], '.2f')} | "
+              f"{fmt(r['length_delta_vs_ref_mm'], '.2f')}/{fmt(r['width_delta_vs_ref_mm'], '.2f')}")